@@ -1,13 +1,32 @@
+import ctypes
+import glob
+import math
+import os
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
-from collections import deque
+
+try:
+    from numba import njit
+except ImportError:
+    # Numba is optional; without it the kernels below run as plain Python
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
 
 # Physical Constants 
 G = 6.67430e-11  # Gravitational constant (m³/kg⋅s²)
 AU = 1.496e11    # Astronomical Unit in meters
 SOLAR_MASS = 1.989e30  # Solar mass in kg
 DAY = 24 * 3600  # One day in seconds
+YEAR = 365.25 * DAY  # One year in seconds
+
+# Unit conversions as multiplies, so the per-frame code avoids divisions
+INV_AU = 1.0 / AU
+INV_DAY = 1.0 / DAY
+INV_YEAR = 1.0 / YEAR
+SPEED_TO_AU_YEAR = YEAR / AU  # m/s to AU/year
 
 # Scaling factors for simulation
 MASS_SCALE = SOLAR_MASS
@@ -17,6 +36,315 @@ TIME_SCALE = DAY * 1  #time scale (1 unit = 1 day)
 # Scaled gravitational constant
 G_scaled = G * MASS_SCALE * (TIME_SCALE**2) / (DISTANCE_SCALE**3)
 
+# Gravitational softening (squared), smaller for more realistic physics
+SOFTENING2 = (0.0001 * DISTANCE_SCALE)**2
+
+# Barnes-Hut quadtree depth limit; (near-)coincident bodies share a leaf below it
+BH_MAX_DEPTH = 48
+
+
+def _accel(px, py, gm, soft2):
+    # General N-body accelerations via broadcasting; dx[i, j] = px[j] - px[i].
+    # The diagonal has dx = dy = 0 (and d2 = soft2 > 0), so it contributes nothing
+    dx = px[np.newaxis, :] - px[:, np.newaxis]
+    dy = py[np.newaxis, :] - py[:, np.newaxis]
+    d2 = dx*dx + dy*dy + soft2
+    weights = gm[np.newaxis, :] / (d2 * np.sqrt(d2))
+    return np.einsum('ij,ij->i', weights, dx), np.einsum('ij,ij->i', weights, dy)
+
+
+@njit(cache=True)
+def _build_quadtree(px, py, gm, capacity):
+    # Flat struct-of-arrays quadtree. Leaves hold at most one body (node_body >= 0),
+    # internal nodes have four children. Returns n_nodes = -1 if capacity is too small.
+    n = px.shape[0]
+    node_cx = np.empty(capacity)
+    node_cy = np.empty(capacity)
+    node_half = np.empty(capacity)
+    node_mass = np.zeros(capacity)
+    node_com_x = np.zeros(capacity)
+    node_com_y = np.zeros(capacity)
+    node_body = np.full(capacity, -1)
+    node_child = np.full((capacity, 4), -1)
+    
+    xmin, xmax = px.min(), px.max()
+    ymin, ymax = py.min(), py.max()
+    node_cx[0] = 0.5 * (xmin + xmax)
+    node_cy[0] = 0.5 * (ymin + ymax)
+    # The root box is the bounding square, floored so that BH_MAX_DEPTH halvings still
+    # stay above the float64 resolution (2**-52 relative) of the coordinates; this
+    # keeps coincident or single bodies from producing a degenerate box
+    scale = max(abs(xmin), abs(xmax), abs(ymin), abs(ymax))
+    node_half[0] = max(0.5 * max(xmax - xmin, ymax - ymin), scale * 2.0**(BH_MAX_DEPTH - 52))
+    n_nodes = 1
+    
+    for b in range(n):
+        x, y, m = px[b], py[b], gm[b]
+        node = 0
+        depth = 0
+        while True:
+            if node_child[node, 0] >= 0:
+                # Internal node: accumulate mass moments and descend
+                node_mass[node] += m
+                node_com_x[node] += m * x
+                node_com_y[node] += m * y
+                q = (1 if x >= node_cx[node] else 0) + (2 if y >= node_cy[node] else 0)
+                node = node_child[node, q]
+                depth += 1
+            elif node_body[node] < 0 or depth >= BH_MAX_DEPTH:
+                # Empty leaf (or depth limit reached): the body settles here
+                if node_body[node] < 0:
+                    node_body[node] = b
+                node_mass[node] += m
+                node_com_x[node] += m * x
+                node_com_y[node] += m * y
+                break
+            else:
+                # Occupied leaf: split it and push the resident body one level down
+                if n_nodes + 4 > capacity:
+                    return (-1, node_cx, node_cy, node_com_x, node_com_y, node_mass,
+                            node_half, node_body, node_child)
+                h = 0.5 * node_half[node]
+                for q in range(4):
+                    c = n_nodes + q
+                    node_cx[c] = node_cx[node] + (h if q & 1 else -h)
+                    node_cy[c] = node_cy[node] + (h if q & 2 else -h)
+                    node_half[c] = h
+                    node_child[node, q] = c
+                n_nodes += 4
+                
+                e = node_body[node]
+                node_body[node] = -1
+                q = (1 if px[e] >= node_cx[node] else 0) + (2 if py[e] >= node_cy[node] else 0)
+                c = node_child[node, q]
+                node_body[c] = e
+                node_mass[c] = gm[e]
+                node_com_x[c] = gm[e] * px[e]
+                node_com_y[c] = gm[e] * py[e]
+    
+    for k in range(n_nodes):
+        if node_mass[k] > 0.0:
+            node_com_x[k] /= node_mass[k]
+            node_com_y[k] /= node_mass[k]
+    return (n_nodes, node_cx, node_cy, node_com_x, node_com_y, node_mass,
+            node_half, node_body, node_child)
+
+
+@njit(fastmath=True, cache=True)
+def _traverse_quadtree(px, py, theta, soft2, node_cx, node_cy, node_com_x, node_com_y,
+                       node_mass, node_half, node_body, node_child):
+    n = px.shape[0]
+    ax_out = np.zeros(n)
+    ay_out = np.zeros(n)
+    stack = np.empty(4 * (BH_MAX_DEPTH + 1), dtype=np.int64)
+    theta2 = theta * theta
+    for i in range(n):
+        x, y = px[i], py[i]
+        ax = 0.0
+        ay = 0.0
+        stack[0] = 0
+        sp = 1
+        while sp > 0:
+            sp -= 1
+            node = stack[sp]
+            if node_mass[node] == 0.0 or node_body[node] == i:
+                continue
+            dx = node_com_x[node] - x
+            dy = node_com_y[node] - y
+            d2 = dx*dx + dy*dy
+            half = node_half[node]
+            # A node whose box holds body i is always opened: with theta > 1/sqrt(2)
+            # the distance to its centre of mass alone could accept it
+            outside = abs(x - node_cx[node]) > half or abs(y - node_cy[node]) > half
+            if node_child[node, 0] < 0 or (outside and 4.0*half*half < theta2 * d2):
+                # Leaf, or far enough away to act as a single pseudo-particle
+                d2 += soft2
+                invr3 = node_mass[node] / (d2 * math.sqrt(d2))
+                ax += invr3 * dx
+                ay += invr3 * dy
+            else:
+                for q in range(4):
+                    stack[sp] = node_child[node, q]
+                    sp += 1
+        ax_out[i] = ax
+        ay_out[i] = ay
+    return ax_out, ay_out
+
+
+def _accel_bh(px, py, gm, theta, soft2):
+    # Barnes-Hut O(N log N) accelerations, with G*m as the node "mass"
+    if len(px) == 0:
+        return np.zeros(0), np.zeros(0)
+    capacity = 4 * len(px) + 16
+    while True:
+        tree = _build_quadtree(px, py, gm, capacity)
+        if tree[0] >= 0:
+            break
+        capacity *= 2
+    return _traverse_quadtree(px, py, theta, soft2, *tree[1:])
+
+
+@njit(fastmath=True, cache=True)
+def _accel3(x0, y0, x1, y1, x2, y2, m0, m1, m2, G, soft2):
+    # Unrolled 3-body accelerations and (softened) potential energy on scalar
+    # positions; each pair is evaluated once and applied to both bodies
+    
+    dx = x1 - x0
+    dy = y1 - y0
+    r2 = dx*dx + dy*dy + soft2
+    invr3 = G / (r2 * math.sqrt(r2))
+    ax0 = m1*invr3*dx
+    ay0 = m1*invr3*dy
+    ax1 = -m0*invr3*dx
+    ay1 = -m0*invr3*dy
+    pe = -m0*m1*invr3*r2
+    
+    dx = x2 - x0
+    dy = y2 - y0
+    r2 = dx*dx + dy*dy + soft2
+    invr3 = G / (r2 * math.sqrt(r2))
+    ax0 += m2*invr3*dx
+    ay0 += m2*invr3*dy
+    ax2 = -m0*invr3*dx
+    ay2 = -m0*invr3*dy
+    pe -= m0*m2*invr3*r2
+    
+    dx = x2 - x1
+    dy = y2 - y1
+    r2 = dx*dx + dy*dy + soft2
+    invr3 = G / (r2 * math.sqrt(r2))
+    ax1 += m2*invr3*dx
+    ay1 += m2*invr3*dy
+    ax2 -= m1*invr3*dx
+    ay2 -= m1*invr3*dy
+    pe -= m1*m2*invr3*r2
+    
+    return ax0, ay0, ax1, ay1, ax2, ay2, pe
+
+
+@njit(fastmath=True, cache=True)
+def _leapfrog_step(px, py, vx, vy, ax, ay, m0, m1, m2, dt, G, soft2):
+    # Kick-drift-kick leapfrog: symplectic, so energy error stays bounded,
+    # and only one force evaluation per step (ax, ay are carried over).
+    # Returns the potential energy at the new positions
+    for i in range(3):
+        vx[i] += 0.5*dt*ax[i]
+        px[i] += dt*vx[i]
+    for i in range(3):
+        vy[i] += 0.5*dt*ay[i]
+        py[i] += dt*vy[i]
+    
+    ax[0], ay[0], ax[1], ay[1], ax[2], ay[2], pe = _accel3(px[0], py[0], px[1], py[1], px[2], py[2],
+                                                           m0, m1, m2, G, soft2)
+    for i in range(3):
+        vx[i] += 0.5*dt*ax[i]
+    for i in range(3):
+        vy[i] += 0.5*dt*ay[i]
+    return pe
+
+
+def _make_kernel(m0, m1, m2, G, soft2):
+    # Build an _advance kernel with the masses, G and softening baked in as
+    # compile-time constants, so LLVM can fold G*m products and fully
+    # specialise the unrolled pair loop for this system
+    @njit(fastmath=True)
+    def _advance(ensemble, dt, n_steps, step, traj_buf, traj_stride,
+                 traj_head, traj_count, potential):
+        # Run n_steps leapfrog steps for every replica of the (R, 6, 3) ensemble in
+        # one call, recording replica 0 into the mirrored trajectory ring buffer
+        # every traj_stride steps (step counts the steps taken before this call);
+        # returns the updated (head, count, potential) of replica 0
+        capacity = traj_buf.shape[1] // 2
+        px, py = ensemble[0, 0], ensemble[0, 1]
+        for k in range(n_steps):
+            for r in range(ensemble.shape[0] - 1, -1, -1):
+                state = ensemble[r]
+                pe = _leapfrog_step(state[0], state[1], state[2], state[3], state[4], state[5],
+                                    m0, m1, m2, dt, G, soft2)
+            potential = pe
+            if (step + k + 1) % traj_stride != 0:
+                continue
+            for i in range(3):
+                traj_buf[i, traj_head, 0] = px[i]
+                traj_buf[i, traj_head, 1] = py[i]
+                traj_buf[i, traj_head + capacity, 0] = px[i]
+                traj_buf[i, traj_head + capacity, 1] = py[i]
+            traj_head = (traj_head + 1) % capacity
+            traj_count = min(traj_count + 1, capacity)
+        return traj_head, traj_count, potential
+    
+    return _advance
+
+
+# Must match NBODY3_ABI in _nbody3.c; bump both whenever advance3's signature changes
+NBODY3_ABI = 1
+
+
+def _load_native_kernel():
+    # Optional C kernel built from _nbody3.c (python setup.py build_ext --inplace,
+    # Linux/macOS only). Builds exporting a different ABI version are skipped
+    here = os.path.dirname(os.path.abspath(__file__))
+    for path in glob.glob(os.path.join(here, '_nbody3*.so')):
+        try:
+            lib = ctypes.CDLL(path)
+            lib.nbody3_abi.restype = ctypes.c_int
+            if lib.nbody3_abi() != NBODY3_ABI:
+                continue
+        except (OSError, AttributeError):
+            continue
+        lib.advance3.restype = ctypes.c_double
+        lib.advance3.argtypes = [ctypes.c_void_p, ctypes.c_int64, ctypes.c_void_p,
+                                 ctypes.c_int64, ctypes.c_int64, ctypes.c_int64, ctypes.c_void_p,
+                                 ctypes.c_double, ctypes.c_int64, ctypes.c_double,
+                                 ctypes.c_double, ctypes.c_double, ctypes.c_double,
+                                 ctypes.c_double, ctypes.c_double]
+        return lib
+    return None
+
+
+def _make_native_kernel(lib, m0, m1, m2, G, soft2):
+    # Same interface as the kernel returned by _make_kernel, backed by advance3.
+    # Arrays are passed as raw pointers, so they must be C-contiguous float64
+    ring = np.zeros(2, dtype=np.int64)
+    
+    def _advance(ensemble, dt, n_steps, step, traj_buf, traj_stride,
+                 traj_head, traj_count, potential):
+        ring[0] = traj_head
+        ring[1] = traj_count
+        potential = lib.advance3(ensemble.ctypes.data, len(ensemble), traj_buf.ctypes.data,
+                                 traj_buf.shape[1] // 2, traj_stride, step, ring.ctypes.data,
+                                 dt, n_steps, G, m0, m1, m2, soft2, potential)
+        return int(ring[0]), int(ring[1]), potential
+    
+    return _advance
+
+
+_native_lib = _load_native_kernel()
+
+
+class RingBuffer:
+    # Fixed-length float history; every value is written twice, one capacity apart,
+    # so view() is always a contiguous oldest-to-newest slice with no copying
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.data = np.empty(2 * capacity)
+        self.head = 0
+        self.count = 0
+    
+    def __len__(self):
+        return self.count
+    
+    def append(self, value):
+        self.data[self.head] = value
+        self.data[self.head + self.capacity] = value
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+    
+    def view(self):
+        start = self.head + self.capacity - self.count
+        return self.data[start:start + self.count]
+
+
 class ThreeBodySimulator:
     def __init__(self):
         
@@ -25,119 +353,188 @@ class ThreeBodySimulator:
             0.1,    # Medium body 
             0.05    # Small body 
         ]) * MASS_SCALE
+        self.gm = G_scaled * self.masses
         
         
-        self.positions = np.array([
+        positions = np.array([
             [0.0, 0.0],      # Central body at origin
             [1.5, 0.0],      # Second body to the right
             [0.75, 1.3]      # Third body forming triangle
         ]) * DISTANCE_SCALE
         
         
-        self.velocities = np.array([
+        velocities = np.array([
             [0.0, 1.0],      # Central body with significant motion
             [0.0, -3.0],     # Second body very fast orbital motion
             [-2.5, 1.5]      # Third body very fast orbital motion
         ]) * np.sqrt(G_scaled * MASS_SCALE / DISTANCE_SCALE)
         
+        # State is kept as structure-of-arrays: one contiguous row per axis, packed
+        # into a single array (px, py, vx, vy, ax, ay) so kernels get one buffer.
+        # Replica 0 is the displayed system, replica 1 a slightly perturbed shadow
+        # copy used for the Lyapunov exponent; both advance in the same kernel call
+        self.ensemble = np.zeros((2, 6, 3))
+        self.state = self.ensemble[0]
+        self.shadow = self.ensemble[1]
+        self.px, self.py, self.vx, self.vy, self.ax, self.ay = self.state
+        self.px[:] = positions[:, 0]
+        self.py[:] = positions[:, 1]
+        self.vx[:] = velocities[:, 0]
+        self.vy[:] = velocities[:, 1]
+        
         self.adjust_center_of_mass()
         
         # Storage for trajectories and analysis
-        self.trajectory_length = 500
-        self.trajectories = [deque(maxlen=self.trajectory_length) for _ in range(3)]
+        # Trails sample every 4th step: 125 points still span the last 500 steps
+        self.traj_stride = 4
+        self.trajectory_length = 125
+        # Trajectory ring buffer; every sample is written twice, one capacity apart,
+        # so the latest samples are always one contiguous slice (see get_trajectory)
+        self.traj_buf = np.empty((3, 2 * self.trajectory_length, 2))
+        self.traj_head = 0
+        self.traj_count = 0
         
         
         self.dt = TIME_SCALE * 100  # 100 days per step
         self.time = 0.0
+        self.steps = 0
+        
+        self.ax[:], self.ay[:], self.potential = self.compute_accel_and_energy(self.state)
+        
+        # Benettin Lyapunov estimate: offset the shadow by eps in phase space and
+        # renormalise it every renorm_every steps. Velocity offsets are scaled by
+        # dt so both halves of the offset are lengths
+        self.initial_separation = math.hypot(self.px[1] - self.px[2], self.py[1] - self.py[2])
+        self.renorm_every = 10
+        self.lyapunov_rel_eps = 1e-8
+        self._rng = np.random.default_rng(0)
+        self.seed_shadow()
+        self._steps_since_renorm = 0
+        self._lyap_sum = 0.0
+        self._lyap_n = 0
+        
+        # Prefer the native kernel when it has been built, else the Numba one
+        make_kernel = _make_kernel if _native_lib is None else \
+            lambda *args: _make_native_kernel(_native_lib, *args)
+        self._advance = make_kernel(self.masses[0], self.masses[1], self.masses[2],
+                                    G_scaled, SOFTENING2)
+        
+        # Warm-start the JIT so the first animation frame doesn't pay for compilation;
+        # zero steps compiles the kernel without touching the state or trajectory buffers
+        self._advance(self.ensemble, self.dt, 0, self.steps,
+                      self.traj_buf, self.traj_stride,
+                      self.traj_head, self.traj_count, self.potential)
         
         # Chaos analysis parameters
         self.chaos_data = {
-            'times': deque(maxlen=1000),
-            'separations': deque(maxlen=1000),
-            'lyapunov': deque(maxlen=1000),
+            'times': RingBuffer(1000),
+            'separations': RingBuffer(1000),
+            'lyapunov': RingBuffer(1000),
         }
         
-        self.initial_separation = np.linalg.norm(self.positions[1] - self.positions[2])
-        
         
         self.colors = ['gold', 'red', 'blue']
         self.sizes = [20, 15, 12]  
         
     def adjust_center_of_mass(self):
         total_mass = np.sum(self.masses)
-        com_pos = np.sum(self.masses[:, np.newaxis] * self.positions, axis=0) / total_mass
-        com_vel = np.sum(self.masses[:, np.newaxis] * self.velocities, axis=0) / total_mass
-        
-        self.positions -= com_pos
-        self.velocities -= com_vel
-    
-    def compute_accelerations(self):
-        n = len(self.positions)
-        accelerations = np.zeros((n, 2))
-        for i in range(n):
-            for j in range(n):
-                if i != j:
-                    r_vec = self.positions[j] - self.positions[i]
-                    distance = np.linalg.norm(r_vec)
-                    # Smaller softening for more realistic physics
-                    softening = 0.0001 * DISTANCE_SCALE
-                    distance_softened = np.sqrt(distance**2 + softening**2)
-                    force_magnitude = G_scaled * self.masses[j] / distance_softened**3
-                    accelerations[i] += force_magnitude * r_vec
-        return accelerations
-    
-    def update_system(self):
-        # Runge-Kutta 4th order integration for accuracy
-        def derivatives(pos, vel):
-            old_pos = self.positions.copy()
-            self.positions[:] = pos
-            acc = self.compute_accelerations()
-            self.positions[:] = old_pos
-            return vel, acc
-        
-        k1_pos, k1_vel = derivatives(self.positions, self.velocities)
-        k2_pos, k2_vel = derivatives(self.positions + 0.5*self.dt*k1_pos, 
-                                   self.velocities + 0.5*self.dt*k1_vel)
-        k3_pos, k3_vel = derivatives(self.positions + 0.5*self.dt*k2_pos, 
-                                   self.velocities + 0.5*self.dt*k2_vel)
-        k4_pos, k4_vel = derivatives(self.positions + self.dt*k3_pos, 
-                                   self.velocities + self.dt*k3_vel)
-        
-        self.positions += (self.dt/6) * (k1_pos + 2*k2_pos + 2*k3_pos + k4_pos)
-        self.velocities += (self.dt/6) * (k1_vel + 2*k2_vel + 2*k3_vel + k4_vel)
-        
-        self.time += self.dt
-        
-        # Store trajectories
-        for i in range(len(self.positions)):
-            self.trajectories[i].append(self.positions[i].copy())
+        self.px -= np.dot(self.masses, self.px) / total_mass
+        self.py -= np.dot(self.masses, self.py) / total_mass
+        self.vx -= np.dot(self.masses, self.vx) / total_mass
+        self.vy -= np.dot(self.masses, self.vy) / total_mass
+    
+    def compute_accelerations(self, px, py):
+        return _accel(px, py, self.gm, SOFTENING2)
+    
+    def compute_accel_and_energy(self, state):
+        # Accelerations and potential energy from a single pass over the pairs
+        px, py = state[0], state[1]
+        *acc, potential = _accel3(px[0], py[0], px[1], py[1], px[2], py[2],
+                                  self.masses[0], self.masses[1], self.masses[2],
+                                  G_scaled, SOFTENING2)
+        return np.array(acc[0::2]), np.array(acc[1::2]), potential
+    
+    def compute_accelerations_bh(self, px, py, theta=0.7):
+        return _accel_bh(px, py, self.gm, theta, SOFTENING2)
+    
+    def update_system(self, n_steps=1):
+        # Advance in chunks that end on shadow renormalisation boundaries
+        while n_steps > 0:
+            chunk = min(n_steps, self.renorm_every - self._steps_since_renorm)
+            self.traj_head, self.traj_count, self.potential = self._advance(
+                self.ensemble, self.dt, chunk, self.steps,
+                self.traj_buf, self.traj_stride,
+                self.traj_head, self.traj_count, self.potential)
+            self.steps += chunk
+            self.time += chunk * self.dt
+            n_steps -= chunk
+            self._steps_since_renorm += chunk
+            if self._steps_since_renorm == self.renorm_every:
+                self.renormalize_shadow()
         
         self.analyze_chaos()
     
+    def _phase_extent(self):
+        # Largest phase-space coordinate (positions, dt-scaled velocities) of the system
+        return max(self.initial_separation, np.abs(self.state[:2]).max(),
+                   np.abs(self.state[2:4]).max() * self.dt)
+    
+    def _set_shadow_offset(self, offset):
+        # offset is (4, 3): px, py, and dt-scaled vx, vy deviations from the main system
+        self.shadow[:2] = self.state[:2] + offset[:2]
+        self.shadow[2:4] = self.state[2:4] + offset[2:] / self.dt
+        self.shadow[4], self.shadow[5], _ = self.compute_accel_and_energy(self.shadow)
+    
+    def seed_shadow(self):
+        # Generic random direction with the mass-weighted mean of each row removed,
+        # so the offset has no centre-of-mass (translation/drift) component
+        direction = self._rng.standard_normal((4, 3))
+        direction -= (direction @ self.masses)[:, np.newaxis] / np.sum(self.masses)
+        direction /= np.linalg.norm(direction)
+        self.lyapunov_eps = self.lyapunov_rel_eps * self._phase_extent()
+        self._set_shadow_offset(self.lyapunov_eps * direction)
+    
+    def renormalize_shadow(self):
+        # Accumulate the growth of the shadow's phase-space offset, then pull it back
+        # to an eps re-derived from the current extent so it stays well above round-off
+        offset = np.empty((4, 3))
+        offset[:2] = self.shadow[:2] - self.state[:2]
+        offset[2:] = (self.shadow[2:4] - self.state[2:4]) * self.dt
+        distance = np.linalg.norm(offset)
+        extent = self._phase_extent()
+        resolution = 4 * np.spacing(extent)
+        if distance > resolution:
+            self._lyap_sum += math.log(distance / self.lyapunov_eps)
+            self._lyap_n += 1
+            self.lyapunov_eps = self.lyapunov_rel_eps * extent
+            self._set_shadow_offset((self.lyapunov_eps / distance) * offset)
+        else:
+            # Offset collapsed to round-off; the interval carries no information
+            self.seed_shadow()
+        self._steps_since_renorm = 0
+    
+    def get_trajectory(self, i):
+        # Oldest-to-newest view of body i's trail, no copy
+        start = self.traj_head + self.trajectory_length - self.traj_count
+        return self.traj_buf[i, start:start + self.traj_count]
+    
     def analyze_chaos(self):
-        current_separation = np.linalg.norm(self.positions[1] - self.positions[2])
-        self.chaos_data['times'].append(self.time / (DAY * 365.25))
-        self.chaos_data['separations'].append(current_separation / self.initial_separation)
+        current_separation = math.hypot(self.px[1] - self.px[2], self.py[1] - self.py[2])
+        separation_ratio = current_separation / self.initial_separation
+        self.chaos_data['times'].append(self.time * INV_YEAR)
+        self.chaos_data['separations'].append(separation_ratio)
         
-        if len(self.chaos_data['separations']) > 10:
-            separations = np.array(list(self.chaos_data['separations']))
-            valid_separations = separations[separations > 1e-10]
-            if len(valid_separations) > 5:
-                lyapunov = np.mean(np.diff(np.log(valid_separations)))
-                self.chaos_data['lyapunov'].append(lyapunov)
-            else:
-                self.chaos_data['lyapunov'].append(0)
+        # Largest Lyapunov exponent (per year) from the shadow renormalisations
+        if self._lyap_n > 0:
+            elapsed = self._lyap_n * self.renorm_every * self.dt
+            self.chaos_data['lyapunov'].append(self._lyap_sum / elapsed * YEAR)
         else:
             self.chaos_data['lyapunov'].append(0)
     
     def get_energy(self):
-        kinetic = 0.5 * np.sum(self.masses[:, np.newaxis] * self.velocities**2)
-        potential = 0.0
-        for i in range(len(self.masses)):
-            for j in range(i+1, len(self.masses)):
-                r = np.linalg.norm(self.positions[j] - self.positions[i])
-                potential -= G_scaled * self.masses[i] * self.masses[j] / r
-        return kinetic + potential
+        # The potential comes for free from the last force evaluation
+        kinetic = 0.5 * np.sum(self.masses * (self.vx*self.vx + self.vy*self.vy))
+        return kinetic + self.potential
 
 
 sim = ThreeBodySimulator()
@@ -207,11 +604,39 @@ chaos_text = ax3.text(0.02, 0.02, '', transform=ax3.transAxes,
                       fontsize=10, verticalalignment='bottom',
                       bbox=dict(boxstyle='round', facecolor='yellow', alpha=0.9))
 
+# Time-series axes are only rescaled every RESCALE_EVERY frames (blitting needs
+# stable limits in between), so each rescale leaves room for the next window.
+# Start them sized for the first window around the initial values
+STEPS_PER_FRAME = 50
+RESCALE_EVERY = 25
+RESCALE_SPAN = RESCALE_EVERY * STEPS_PER_FRAME * sim.dt * INV_YEAR
+for ax in (ax2, ax3, ax4):
+    ax.set_xlim(0, RESCALE_SPAN)
+initial_energy = sim.get_energy()
+ax2.set_ylim(initial_energy - 0.05*abs(initial_energy), initial_energy + 0.05*abs(initial_energy))
+ax3.set_ylim(0.5, 2.0)
+ax4.set_ylim(0, 1.5 * np.hypot(sim.vx, sim.vy).max() * SPEED_TO_AU_YEAR)
+
+# Chaos levels by Lyapunov time 1/λ: within 100 steps is HIGH, within
+# 1000 steps MODERATE (λ is reported per year)
+CHAOS_HIGH = YEAR / (100 * sim.dt)
+CHAOS_MODERATE = YEAR / (1000 * sim.dt)
+
 # Data storage
-energy_times = deque(maxlen=2000)
-energy_values = deque(maxlen=2000)
-velocity_times = deque(maxlen=2000)
-velocity_data = [deque(maxlen=2000) for _ in range(3)]
+energy_times = RingBuffer(2000)
+energy_values = RingBuffer(2000)
+velocity_times = RingBuffer(2000)
+velocity_data = [RingBuffer(2000) for _ in range(3)]
+
+def lookahead_limits(lows, highs):
+    # Data range widened by the fastest per-frame change over the last rescale
+    # window, kept up for the RESCALE_EVERY frames until the next rescale
+    low, high = lows.min(), highs.max()
+    margin = 0.05 * ((high - low) or abs(high) or 1.0)
+    recent = slice(-RESCALE_EVERY - 1, None)
+    fall = np.abs(np.diff(lows[recent])).max() * RESCALE_EVERY
+    rise = np.abs(np.diff(highs[recent])).max() * RESCALE_EVERY
+    return low - fall - margin, high + rise + margin
 
 def init():
     for body in bodies:
@@ -227,74 +652,81 @@ def init():
     return bodies + trails + [energy_line, separation_line] + velocity_lines + [time_text, chaos_text]
 
 def animate(frame):
-    # 50 updates per frame 
-    for _ in range(50):
-        sim.update_system()
+    sim.update_system(STEPS_PER_FRAME)
+    years = sim.time * INV_YEAR
     
-    # Update body positions
+    # Update body positions (one vectorized conversion to AU per frame)
+    px_au = sim.px * INV_AU
+    py_au = sim.py * INV_AU
     for i, body in enumerate(bodies):
-        x, y = sim.positions[i]
-        body.set_data([x/AU], [y/AU])
+        body.set_data(px_au[i:i+1], py_au[i:i+1])
     
     # Update trails
-    for i, trail in enumerate(trails):
-        if len(sim.trajectories[i]) > 1:
-            traj = np.array(list(sim.trajectories[i]))
-            trail.set_data(traj[:, 0]/AU, traj[:, 1]/AU)
+    if sim.traj_count > 1:
+        for i, trail in enumerate(trails):
+            traj = sim.get_trajectory(i)
+            trail.set_data(traj[:, 0]*INV_AU, traj[:, 1]*INV_AU)
     
     # energy plot
     current_energy = sim.get_energy()
-    energy_times.append(sim.time / (DAY * 365.25))
+    energy_times.append(years)
     energy_values.append(current_energy)
     
     if len(energy_times) > 1:
-        energy_line.set_data(list(energy_times), list(energy_values))
-        ax2.relim()
-        ax2.autoscale_view()
+        energy_line.set_data(energy_times.view(), energy_values.view())
     
     # separation plot
     if len(sim.chaos_data['times']) > 1:
-        separation_line.set_data(list(sim.chaos_data['times']), 
-                                list(sim.chaos_data['separations']))
-        ax3.relim()
-        ax3.autoscale_view()
+        separation_line.set_data(sim.chaos_data['times'].view(), 
+                                sim.chaos_data['separations'].view())
     
     # velocity plot
-    current_time = sim.time / (DAY * 365.25)
-    velocity_times.append(current_time)
+    velocity_times.append(years)
+    speeds = np.hypot(sim.vx, sim.vy) * SPEED_TO_AU_YEAR
     for i in range(3):
-        speed = np.linalg.norm(sim.velocities[i]) * (365.25 * DAY) / AU  # Convert to AU/year
-        velocity_data[i].append(speed)
+        velocity_data[i].append(speeds[i])
         if len(velocity_times) > 1:
-            velocity_lines[i].set_data(list(velocity_times), list(velocity_data[i]))
+            velocity_lines[i].set_data(velocity_times.view(), velocity_data[i].view())
     
-    if len(velocity_times) > 1:
-        ax4.relim()
-        ax4.autoscale_view()
+    # Blitting only redraws the animated artists, so when the limits change the
+    # static parts (ticks, grid) need one full redraw to refresh the background.
+    # The schedule starts on frame 1, the first one with a line to fit
+    if frame % RESCALE_EVERY == 1:
+        x_end = years + RESCALE_SPAN
+        energy = energy_values.view()
+        ax2.set_xlim(energy_times.view()[0], x_end)
+        ax2.set_ylim(*lookahead_limits(energy, energy))
+        # Separation axis is logarithmic, so pad it in decades
+        log_sep = np.log10(sim.chaos_data['separations'].view())
+        ax3.set_xlim(sim.chaos_data['times'].view()[0], x_end)
+        ax3.set_ylim(*(10.0 ** np.array(lookahead_limits(log_sep, log_sep))))
+        speeds = np.array([v.view() for v in velocity_data])
+        ax4.set_xlim(velocity_times.view()[0], x_end)
+        ax4.set_ylim(*lookahead_limits(speeds.min(axis=0), speeds.max(axis=0)))
+        fig.canvas.draw()
     
     #text displays
-    years = sim.time / (DAY * 365.25)
-    days = sim.time / DAY
+    days = sim.time * INV_DAY
     time_text.set_text(f'Time: {years:.2f} years\n({days:.0f} days)\nEnergy: {current_energy:.2e}')
     
     if len(sim.chaos_data['lyapunov']) > 0:
-        avg_lyapunov = np.mean(list(sim.chaos_data['lyapunov'])[-10:])
-        chaos_level = "HIGH" if avg_lyapunov > 0.01 else "MODERATE" if avg_lyapunov > 0.001 else "LOW"
-        chaos_text.set_text(f'Chaos Level: {chaos_level}\nLyapunov: {avg_lyapunov:.4f}')
+        avg_lyapunov = np.mean(sim.chaos_data['lyapunov'].view()[-10:])
+        chaos_level = "HIGH" if avg_lyapunov > CHAOS_HIGH else "MODERATE" if avg_lyapunov > CHAOS_MODERATE else "LOW"
+        chaos_text.set_text(f'Chaos Level: {chaos_level}\nLyapunov: {avg_lyapunov:.4f} /yr')
     
     return bodies + trails + [energy_line, separation_line] + velocity_lines + [time_text, chaos_text]
 
 # Create animation
 ani = FuncAnimation(fig, animate, frames=50000, init_func=init, 
-                   blit=False, interval=10, repeat=True)  # 10ms = very fast refresh
+                   blit=True, interval=10, repeat=True)  # 10ms = very fast refresh
 
 plt.tight_layout()
 plt.show()
 
 print("=== U 3-Body Problem Simulation ===")
-print(f"Time scale: 1 animation step = {sim.dt * 50 / DAY:.0f} days")
+print(f"Time scale: 1 animation step = {sim.dt * STEPS_PER_FRAME / DAY:.0f} days")
 print(f"Animation speed: ~100 steps per second")
-print(f"Real time ratio: 1 second of animation ≈ {sim.dt * 50 * 100 / (DAY * 365.25):.0f} years")
+print(f"Real time ratio: 1 second of animation ≈ {sim.dt * STEPS_PER_FRAME * 100 / YEAR:.0f} years")
 print()
 print("What to observe:")
 print("• Body movements and orbital patterns")
@@ -0,0 +1,122 @@
+/*
+ * Native 3-body leapfrog kernel, an optional drop-in for the Numba kernel
+ * built by _make_kernel() in 3BodyProblem.py. Loaded through ctypes as a
+ * plain shared library, so only Linux/macOS builds (.so) are supported.
+ *
+ * Build with:  python setup.py build_ext --inplace
+ */
+#include <math.h>
+#include <stdint.h>
+
+/* Bump together with NBODY3_ABI in 3BodyProblem.py whenever advance3 changes */
+#define NBODY3_ABI 1
+
+int nbody3_abi(void)
+{
+    return NBODY3_ABI;
+}
+
+/* Unrolled pair accelerations; returns the (softened) potential energy */
+static double accel3(const double *px, const double *py, double *ax, double *ay,
+                     double m0, double m1, double m2, double G, double soft2)
+{
+    double dx, dy, r2, invr3, pe;
+
+    dx = px[1] - px[0];
+    dy = py[1] - py[0];
+    r2 = dx*dx + dy*dy + soft2;
+    invr3 = G / (r2 * sqrt(r2));
+    ax[0] = m1*invr3*dx;
+    ay[0] = m1*invr3*dy;
+    ax[1] = -m0*invr3*dx;
+    ay[1] = -m0*invr3*dy;
+    pe = -m0*m1*invr3*r2;
+
+    dx = px[2] - px[0];
+    dy = py[2] - py[0];
+    r2 = dx*dx + dy*dy + soft2;
+    invr3 = G / (r2 * sqrt(r2));
+    ax[0] += m2*invr3*dx;
+    ay[0] += m2*invr3*dy;
+    ax[2] = -m0*invr3*dx;
+    ay[2] = -m0*invr3*dy;
+    pe -= m0*m2*invr3*r2;
+
+    dx = px[2] - px[1];
+    dy = py[2] - py[1];
+    r2 = dx*dx + dy*dy + soft2;
+    invr3 = G / (r2 * sqrt(r2));
+    ax[1] += m2*invr3*dx;
+    ay[1] += m2*invr3*dy;
+    ax[2] -= m1*invr3*dx;
+    ay[2] -= m1*invr3*dy;
+    pe -= m1*m2*invr3*r2;
+
+    return pe;
+}
+
+/* One kick-drift-kick step of a 6x3 state (rows px, py, vx, vy, ax, ay) */
+static double leapfrog_step(double *state, double dt, double G,
+                            double m0, double m1, double m2, double soft2)
+{
+    double *px = state, *py = state + 3, *vx = state + 6, *vy = state + 9;
+    double *ax = state + 12, *ay = state + 15;
+    double pe;
+
+    for (int i = 0; i < 3; i++) {
+        vx[i] += 0.5*dt*ax[i];
+        px[i] += dt*vx[i];
+    }
+    for (int i = 0; i < 3; i++) {
+        vy[i] += 0.5*dt*ay[i];
+        py[i] += dt*vy[i];
+    }
+
+    pe = accel3(px, py, ax, ay, m0, m1, m2, G, soft2);
+
+    for (int i = 0; i < 3; i++)
+        vx[i] += 0.5*dt*ax[i];
+    for (int i = 0; i < 3; i++)
+        vy[i] += 0.5*dt*ay[i];
+    return pe;
+}
+
+/*
+ * ensemble: n_replicas x 6 x 3 doubles, each replica with rows
+ *           px, py, vx, vy, ax, ay (updated in place)
+ * traj:     3 x (2*capacity) x 2 mirrored trajectory ring buffer (replica 0),
+ *           sampled every traj_stride steps; step counts the steps taken so far
+ * ring:     {head, count} of the ring buffer (updated in place)
+ * Returns the potential energy of replica 0 after the last step.
+ */
+double advance3(double *ensemble, int64_t n_replicas, double *traj, int64_t capacity,
+                int64_t traj_stride, int64_t step, int64_t *ring, double dt, int64_t n_steps, double G,
+                double m0, double m1, double m2, double soft2, double potential)
+{
+    const double *px = ensemble, *py = ensemble + 3;
+    int64_t head = ring[0], count = ring[1];
+
+    for (int64_t k = 0; k < n_steps; k++) {
+        for (int64_t r = n_replicas - 1; r > 0; r--)
+            leapfrog_step(ensemble + 18*r, dt, G, m0, m1, m2, soft2);
+        potential = leapfrog_step(ensemble, dt, G, m0, m1, m2, soft2);
+
+        if ((step + k + 1) % traj_stride != 0)
+            continue;
+
+        for (int i = 0; i < 3; i++) {
+            double *body = traj + i * 4 * capacity;
+            body[2*head] = px[i];
+            body[2*head + 1] = py[i];
+            body[2*(head + capacity)] = px[i];
+            body[2*(head + capacity) + 1] = py[i];
+        }
+        head = (head + 1) % capacity;
+        if (count < capacity)
+            count++;
+    }
+
+    ring[0] = head;
+    ring[1] = count;
+    return potential;
+}
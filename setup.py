@@ -0,0 +1,17 @@
+# Builds the optional native kernel (_nbody3.c) that 3BodyProblem.py picks up
+# when present (Linux/macOS only; the kernel is loaded with ctypes as a plain
+# shared library, which a Windows .pyd build does not export):
+#
+#     python setup.py build_ext --inplace
+from setuptools import setup, Extension
+
+setup(
+    name='three-body-simulator',
+    ext_modules=[
+        Extension(
+            '_nbody3',
+            sources=['_nbody3.c'],
+            extra_compile_args=['-O3', '-march=native', '-ffast-math', '-funroll-loops'],
+        )
+    ],
+)